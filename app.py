@@ -10,16 +10,15 @@ from streamlit_gsheets import GSheetsConnection
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 sys.path.append(os.path.dirname(__file__))
 
-from src.bot_logic import calc_name_value, calc_name_number, calc_day_number, calc_pattern_index, get_archetype_label
-from src.generator import generate_fortune_message
-
 # main.py の import エラーを防ぐための互換インポート
 try:
-    from src.main import load_json, choose_quote, QUOTES_FILE, PATTERNS_FILE
+    from src.fortune_service import get_data_store, build_fortune, get_fortune_message
+    from src.warmup import start_warmup
+    from src.traffic import record_request, SOURCE_SHARED, SOURCE_CLICK
 except ModuleNotFoundError:
-    from bot_logic import calc_name_value, calc_name_number, calc_day_number, calc_pattern_index, get_archetype_label
-    from generator import generate_fortune_message
-    from main import load_json, choose_quote, QUOTES_FILE, PATTERNS_FILE
+    from fortune_service import get_data_store, build_fortune, get_fortune_message
+    from warmup import start_warmup
+    from traffic import record_request, SOURCE_SHARED, SOURCE_CLICK
 
 # タイムゾーン定義 (JST)
 JST = datetime.timezone(datetime.timedelta(hours=9))
@@ -38,6 +37,11 @@ try:
 except Exception:
     conn = None
 
+# ウォームアップは serve.py からの起動時にプロセス単位で実行される
+# streamlit run app.py で直接起動した場合のみ、初回実行時に軽量版を開始する
+# (ユーザーのリクエストと Gemini の利用枠を奪い合わないよう、事前生成は行わない)
+start_warmup(conn=conn, api_key=os.environ.get("GEMINI_API_KEY"), top_n=0, trigger="session")
+
 # カスタムCSS
 st.markdown("""
 <style>
@@ -185,6 +189,7 @@ st.markdown('<div class="main-title">ビズフォーチュン</div>', unsafe_all
 st.markdown("<p style='text-align: center; color: #9ca3af; margin-bottom: 2rem;'>ビジネスパーソンのための日次行動指針</p>", unsafe_allow_html=True)
 
 # ガイドキャラクター
+@st.cache_data
 def get_image_base64(path):
     if os.path.exists(path):
         with open(path, "rb") as f:
@@ -245,39 +250,19 @@ if should_run:
             if generate_clicked:
                 target_date = datetime.datetime.now(JST).date()
             
-            date_str = target_date.strftime("%Y%m%d")
-            
             try:
-                quotes_db = load_json(QUOTES_FILE)
-                patterns_db = load_json(PATTERNS_FILE)
+                get_data_store()
             except Exception as e:
                 st.error(f"Data loading error: {e}")
                 st.stop()
 
-            name_value = calc_name_value(account_id)
-            name_number = calc_name_number(name_value)
-            day_number = calc_day_number(target_date)
-            pattern_index = calc_pattern_index(account_id, target_date)
-            pattern_data = patterns_db[pattern_index - 1]
-            
-            # 日替わりアーキタイプ (Name + Day)
-            daily_number = ((name_number + day_number - 1) % 9) + 1
-            archetype_label = get_archetype_label(daily_number)
-            
-            quote = choose_quote(pattern_data["quote_category"], account_id, date_str, quotes_db)
+            fortune = build_fortune(account_id, target_date)
+            archetype_label = fortune["archetype_label"]
+            pattern_data = fortune["pattern_data"]
+            date_str = fortune["date_str"]
 
-            context_data = {
-                "account_name": account_id,
-                "archetype": archetype_label,
-                "base_theme": pattern_data["base_theme"],
-                "focus_area": pattern_data["focus_area"],
-                "action_style": pattern_data["action_style"],
-                "caution_style": pattern_data["caution_style"],
-                "day_number": day_number,
-                "quote_ja": quote["quote_ja"],
-                "quote_author_ja": quote.get("author_ja", quote.get("quote_author_ja")),
-                "quote_source_ja": quote.get("source_ja", quote.get("quote_source_ja"))
-            }
+            # トラフィック記録 (TRAFFIC_TRACE_PATH 設定時のみ、匿名化して記録)
+            record_request(account_id, date_str, SOURCE_CLICK if generate_clicked else SOURCE_SHARED)
 
             # ログ記録 (Google Sheets)
             if conn:
@@ -306,7 +291,7 @@ if should_run:
                  st.warning("API Key not found. Showing basic info only.")
                  generated_text = "（APIキー未設定のためAIメッセージは生成されませんでした）"
             else:
-                 generated_text = generate_fortune_message(api_key, context_data)
+                 generated_text = get_fortune_message(api_key, fortune)
 
             # 結果表示
             st.markdown(f"### 📅 {target_date.strftime('%Y.%m.%d')} | {archetype_label}")
@@ -0,0 +1,103 @@
+import os
+import re
+import sys
+import argparse
+
+# app.py を Streamlit で起動する前に、同じプロセス内でウォームアップを開始するランチャー
+# streamlit run app.py だと app.py はブラウザのセッション接続時に初めて実行されるため、
+# ウォームアップが最初のユーザーのリクエストと同時に走ってしまう
+#
+# 使い方: python serve.py [--health-port 8502] [--server.port 8501 ...]
+# Streamlit の設定は streamlit run と同じく、.streamlit/config.toml / STREAMLIT_* 環境変数 /
+# --server.port 形式の引数 (後ろほど優先) で指定できる
+# (bootstrap を直接呼ぶと機密以外の STREAMLIT_* 環境変数は Streamlit 側で読まれないため、
+#  collect_flag_options() で streamlit run の CLI と同じように集めて渡す)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, APP_DIR)
+sys.path.append(os.path.join(APP_DIR, 'src'))
+
+from src.warmup import start_warmup, start_health_server
+
+def open_sheets_connection():
+    """app.py と同じ Google Sheets 接続 (Secrets がない場合は None)"""
+    try:
+        import streamlit as st
+        from streamlit_gsheets import GSheetsConnection
+        return st.connection("gsheets", type=GSheetsConnection)
+    except Exception as e:
+        print(f"Warm-up: Sheets connection unavailable ({e})")
+        return None
+
+def _env_var_name(option):
+    # Streamlit の ConfigOption.env_var と同じ規則 (server.enableCORS -> STREAMLIT_SERVER_ENABLE_CORS)
+    env_var = getattr(option, "env_var", None)
+    if env_var:
+        return env_var
+    name = option.key.replace(".", "_")
+    name = re.sub("(.)([A-Z][a-z]+)", r"\1_\2", name)
+    name = re.sub("([a-z0-9])([A-Z])", r"\1_\2", name)
+    return f"STREAMLIT_{name.upper()}"
+
+def collect_flag_options(argv, parser):
+    """
+    STREAMLIT_* 環境変数と --<section>.<option> 引数から、streamlit run の CLI と同じ形の flag_options を作る
+    値の型変換も CLI と同じく click で行う
+    """
+    import click
+    from streamlit import config
+
+    options = config.get_config_options()
+    raw_values = {}
+    for key, option in options.items():
+        value = os.environ.get(_env_var_name(option))
+        if value is not None:
+            raw_values[key] = value.split() if option.multiple else [value]
+
+    from_args = {}
+    i = 0
+    while i < len(argv):
+        token = argv[i]
+        if not token.startswith("--"):
+            parser.error(f"unrecognized argument: {token}")
+        key, sep, value = token[2:].partition("=")
+        if not sep:
+            if i + 1 >= len(argv):
+                parser.error(f"argument --{key}: expected a value")
+            i += 1
+            value = argv[i]
+        if key not in options:
+            parser.error(f"unknown Streamlit option: --{key}")
+        from_args.setdefault(key, []).append(value)
+        i += 1
+    raw_values.update(from_args)
+
+    flag_options = {}
+    for key, values in raw_values.items():
+        option = options[key]
+        param_type = click.types.convert_type(option.type)
+        converted = [param_type.convert(value, None, None) for value in values]
+        flag_options[key.replace(".", "_")] = tuple(converted) if option.multiple else converted[-1]
+    return flag_options
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm up caches, then serve app.py with Streamlit")
+    parser.add_argument("--health-port", type=int, default=int(os.environ.get("WARMUP_HEALTH_PORT", 0)),
+                        help="Port for the GET /ready probe (0 = disabled)")
+    args, streamlit_argv = parser.parse_known_args()
+
+    # Secrets / config.toml (.streamlit/) は作業ディレクトリ基準で読まれる
+    os.chdir(APP_DIR)
+    flag_options = collect_flag_options(streamlit_argv, parser)
+
+    if args.health_port:
+        start_health_server(args.health_port)
+    start_warmup(conn=open_sheets_connection(), api_key=os.environ.get("GEMINI_API_KEY"))
+
+    from streamlit.web import bootstrap
+    main_script_path = os.path.join(APP_DIR, "app.py")
+    bootstrap.load_config_options(flag_options=flag_options)
+    bootstrap.run(main_script_path, False, [], flag_options)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import os
+import json
+import atexit
+import argparse
+import threading
+import timeit
+from collections import OrderedDict
+try:
+    from src.bot_logic import get_char_value, calc_name_value, calc_name_number, get_a_b, calc_pattern_index_from_a_b
+except ModuleNotFoundError:
+    from bot_logic import get_char_value, calc_name_value, calc_name_number, get_a_b, calc_pattern_index_from_a_b
+
+DEFAULT_MAX_SIZE = 4096
+
+def build_profile(account_id):
+    """
+    アカウントIDから日付に依存しない値 (name_value, name_number, a, b) を算出する
+    """
+    name_value = calc_name_value(account_id)
+    a, b = get_a_b(name_value)
+    return {
+        "name_value": name_value,
+        "name_number": calc_name_number(name_value),
+        "a": a,
+        "b": b,
+    }
+
+def calc_pattern_index_for_profile(profile, date_obj):
+    """プロファイルの係数から 1〜365 のパターンインデックスを算出"""
+    return calc_pattern_index_from_a_b(profile["a"], profile["b"], date_obj.timetuple().tm_yday)
+
+PROFILE_KEYS = frozenset(("name_value", "name_number", "a", "b"))
+
+def _is_valid_profile(profile):
+    """保存ファイルから読んだプロファイルが build_profile() と同じ形かどうか"""
+    return (
+        isinstance(profile, dict)
+        and profile.keys() == PROFILE_KEYS
+        and all(type(value) is int for value in profile.values())
+    )
+
+class AccountProfileCache:
+    """
+    アカウントID -> プロファイル の上限付きLRUキャッシュ
+    persist_path を指定すると JSON ファイルへ保存・読み込みできる
+    (Streamlit はセッションごとにスレッドが分かれるためロックで保護する)
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, persist_path=None):
+        self.max_size = max_size
+        self.persist_path = persist_path
+        self.hits = 0
+        self.misses = 0
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+        if persist_path:
+            self.load()
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def __contains__(self, account_id):
+        return account_id in self._profiles
+
+    def get(self, account_id):
+        """プロファイルを取得 (未計算なら算出してキャッシュする)"""
+        with self._lock:
+            profile = self._profiles.get(account_id)
+            if profile is not None:
+                self._profiles.move_to_end(account_id)
+                self.hits += 1
+                return profile
+            self.misses += 1
+
+        profile = build_profile(account_id)
+        with self._lock:
+            self._put(account_id, profile)
+        return profile
+
+    def get_many(self, account_ids):
+        """複数アカウントのプロファイルをまとめて取得 (入力順の dict を返す)"""
+        return {account_id: self.get(account_id) for account_id in account_ids}
+
+    def _put(self, account_id, profile):
+        self._profiles[account_id] = profile
+        self._profiles.move_to_end(account_id)
+        while len(self._profiles) > self.max_size:
+            self._profiles.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def load(self):
+        """persist_path から読み込む (ファイルが無い・壊れている場合は空のまま、形式の合わない項目は読み飛ばす)"""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Profile cache load error: {e}")
+            return
+        if not isinstance(data, dict):
+            print("Profile cache load error: unexpected file format")
+            return
+        skipped = 0
+        with self._lock:
+            # 保存時は古い順に並んでいるので、そのまま入れれば LRU 順が復元される
+            for account_id, profile in data.items():
+                if not _is_valid_profile(profile):
+                    skipped += 1
+                    continue
+                self._put(account_id, profile)
+        if skipped:
+            print(f"Profile cache load: skipped {skipped} invalid entries")
+
+    def save(self):
+        """persist_path へ保存 (書き込み途中のファイルを残さないよう置き換えで保存)"""
+        if not self.persist_path:
+            return
+        with self._lock:
+            data = dict(self._profiles)
+        tmp_path = f"{self.persist_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.persist_path)
+
+# アプリ全体で共有するキャッシュ
+# ACCOUNT_PROFILE_CACHE_PATH を設定すると再起動をまたいで保持される
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = AccountProfileCache(
+                max_size=int(os.environ.get("ACCOUNT_PROFILE_CACHE_SIZE", DEFAULT_MAX_SIZE)),
+                persist_path=os.environ.get("ACCOUNT_PROFILE_CACHE_PATH") or None,
+            )
+            if _default_cache.persist_path:
+                atexit.register(_default_cache.save)
+        return _default_cache
+
+def get_profile(account_id):
+    return get_default_cache().get(account_id)
+
+def get_profiles(account_ids):
+    return get_default_cache().get_many(account_ids)
+
+def _legacy_name_value(account_id):
+    # 変換テーブル導入前の実装 (ベンチマーク比較用)
+    return sum(get_char_value(c) for c in account_id)
+
+def run_benchmark(number=100000):
+    """名前由来の値の算出について、旧実装・変換テーブル・キャッシュ経由を比較する"""
+    account_ids = [f"user_{i:05d}_BizFortune" for i in range(1000)]
+    cache = AccountProfileCache(max_size=len(account_ids))
+    cache.get_many(account_ids)
+
+    def legacy():
+        for account_id in account_ids:
+            name_value = _legacy_name_value(account_id)
+            calc_name_number(name_value)
+            get_a_b(name_value)
+
+    def translated():
+        for account_id in account_ids:
+            build_profile(account_id)
+
+    def cached():
+        for account_id in account_ids:
+            cache.get(account_id)
+
+    rounds = max(1, number // len(account_ids))
+    results = {}
+    for label, func in (("legacy", legacy), ("translate", translated), ("cached", cached)):
+        elapsed = min(timeit.repeat(func, number=rounds, repeat=3))
+        results[label] = elapsed / (rounds * len(account_ids)) * 1e9
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Account profile cache micro benchmark")
+    parser.add_argument("--number", type=int, default=100000, help="Lookups per measurement")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.number)
+    base = results["legacy"]
+    for label, ns in results.items():
+        print(f"{label:>10}: {ns:8.1f} ns/account  (x{base / ns:.1f})")
+
+if __name__ == "__main__":
+    main()
@@ -23,9 +23,14 @@ def get_char_value(c):
         # 記号(_, 等)
         return 5
 
+# 1バイト文字 -> 文字数値 の変換テーブル (get_char_value と同じ定義)
+# 非ASCII文字は encode("ascii", "replace") で "?" (=記号扱いの5) になる
+_CHAR_VALUE_TABLE = bytes(get_char_value(chr(i)) for i in range(256))
+
 def calc_name_value(account_id):
     """アカウントIDの数値合計を算出"""
-    return sum(get_char_value(c) for c in account_id)
+    # 1文字ずつ get_char_value を呼ぶ代わりに bytes.translate で一括変換する
+    return sum(account_id.encode("ascii", "replace").translate(_CHAR_VALUE_TABLE))
 
 def calc_name_number(name_value):
     """1〜9の名前ナンバーを算出"""
@@ -63,9 +68,16 @@ def calc_pattern_index(account_id, date_obj):
 
     name_value = calc_name_value(account_id)
     a, b = get_a_b(name_value)
-    
-    pattern_index = ((a * (day_of_year - 1) + b) % 365) + 1
-    return pattern_index
+    return calc_pattern_index_from_a_b(a, b, day_of_year)
+
+def calc_pattern_index_from_a_b(a, b, day_of_year):
+    """
+    算出済みの係数 a, b から 1〜365 のパターンインデックスを算出
+    (アカウントプロファイルのキャッシュから呼ぶ場合は名前の再計算が不要)
+    """
+    if day_of_year > 365:
+        day_of_year = 1 # 簡易的なフォールバック
+    return ((a * (day_of_year - 1) + b) % 365) + 1
 
 def get_archetype_label(name_number):
     """名前ナンバーに対応するアーキタイプ名"""
@@ -0,0 +1,300 @@
+import os
+import csv
+import json
+import argparse
+import datetime
+from itertools import islice
+
+# ログ (Google Sheets) と生成済みメッセージ (RESULTS_LOG_PATH) を、一定サイズのチャンクごとに読み書きするエクスポート
+# conn.read() で全件を1つの DataFrame に読み込まず、シートからも1ページ分の行範囲だけを取得するので、
+# ログが増えてもメモリ使用量は一定
+
+DEFAULT_PAGE_SIZE = 500
+LOG_FIELDS = ["timestamp", "account_id", "archetype", "theme"]
+# fortune_service.RESULT_LOG_FIELDS と同じ並び
+RESULT_FIELDS = ["timestamp", "date", "account_id", "archetype", "message"]
+FORMATS = ("csv", "jsonl", "parquet")
+
+def _column_letter(index):
+    """1始まりの列番号を A1 表記の列名に変換する"""
+    letters = ""
+    while index > 0:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return letters
+
+def open_log_worksheet(worksheet=None):
+    """
+    Streamlit の Secrets (connections.gsheets) の設定でログのワークシートを gspread で開く
+    (ログの書き込みに必要なサービスアカウント接続のみ対応。公開URLの読み込みは範囲指定ができないため非対応)
+    """
+    import gspread
+    import streamlit as st
+
+    config = dict(st.secrets["connections"]["gsheets"])
+    spreadsheet = config.pop("spreadsheet")
+    configured_worksheet = config.pop("worksheet", None)
+    worksheet = worksheet or configured_worksheet
+    client = gspread.service_account_from_dict(config)
+    if spreadsheet.startswith("http"):
+        book = client.open_by_url(spreadsheet)
+    else:
+        book = client.open_by_key(spreadsheet)
+    # app.py はワークシート名を指定せずに先頭のシートへ記録している
+    return book.worksheet(worksheet) if worksheet else book.sheet1
+
+class SheetsLogSource:
+    """
+    Google Sheets のログを page_size 行ずつ読む
+    GSheetsConnection.read() はシート全体をダウンロードしてから行を切り出すため使わず、
+    gspread のワークシートに行範囲 (例: A2:D501) を指定して1ページ分だけ取得する
+    """
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+
+    def iter_pages(self, start=0, page_size=DEFAULT_PAGE_SIZE):
+        header = self.worksheet.row_values(1)
+        if not header:
+            return
+        last_column = _column_letter(len(header))
+        # 1行目はヘッダーなので、データの offset 行目はシートの offset + 2 行目
+        offset = start
+        while True:
+            first_row = offset + 2
+            last_row = first_row + page_size - 1
+            values = self.worksheet.get(f"A{first_row}:{last_column}{last_row}")
+            if not values:
+                return
+            # 末尾の空セルは返ってこないので None で埋める
+            yield [
+                dict(zip(header, list(row) + [None] * (len(header) - len(row))))
+                for row in values
+            ]
+            offset += len(values)
+            if len(values) < page_size:
+                return
+
+class CsvLogSource:
+    """ダウンロード済みのログ CSV (ヘッダー付き) を page_size 行ずつ読む"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def iter_pages(self, start=0, page_size=DEFAULT_PAGE_SIZE):
+        with open(self.path, "r", encoding="utf-8", newline="") as f:
+            rows = islice(csv.DictReader(f), start, None)
+            while True:
+                page = list(islice(rows, page_size))
+                if not page:
+                    return
+                yield page
+
+class JsonlResultSource:
+    """生成済みメッセージの記録 (fortune_service.append_result_log の JSON Lines) を page_size 行ずつ読む"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def iter_pages(self, start=0, page_size=DEFAULT_PAGE_SIZE):
+        with open(self.path, "r", encoding="utf-8") as f:
+            # 書き込み途中の最終行などの壊れた行も1行として数え、カーソルの位置をずらさない
+            lines = islice(f, start, None)
+            while True:
+                page = []
+                for line in islice(lines, page_size):
+                    try:
+                        page.append(json.loads(line))
+                    except ValueError:
+                        page.append({})
+                if not page:
+                    return
+                yield page
+
+def filter_log_rows(rows, date_from=None, date_to=None, archetype=None, date_field="timestamp"):
+    """
+    日付範囲 (datetime.date, 両端を含む) とアーキタイプ (部分一致) で絞り込む
+    date_field の値は "YYYY-MM-DD HH:MM:SS" (app.py のログ) か "YYYYMMDD" (生成結果の対象日) を前提とする
+    """
+    start = date_from.strftime("%Y%m%d") if date_from else None
+    end = date_to.strftime("%Y%m%d") if date_to else None
+    for row in rows:
+        if not row:
+            continue
+        day = str(row.get(date_field) or "")[:10].replace("-", "")
+        if start and day < start:
+            continue
+        if end and day > end:
+            continue
+        if archetype and archetype not in str(row.get("archetype") or ""):
+            continue
+        yield row
+
+class CsvWriter:
+    def __init__(self, path, fields, append=False):
+        write_header = not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+        self._file = open(path, "a" if append else "w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=fields, extrasaction="ignore")
+        if write_header:
+            self._writer.writeheader()
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class JsonlWriter:
+    def __init__(self, path, fields, append=False):
+        self.fields = fields
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, rows):
+        for row in rows:
+            record = {field: row.get(field) for field in self.fields}
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+def parquet_part_path(path):
+    """out.parquet に続く、まだ存在しない out.partN.parquet のパス (N は1から)"""
+    stem, ext = os.path.splitext(path)
+    n = 1
+    while os.path.exists(f"{stem}.part{n}{ext}"):
+        n += 1
+    return f"{stem}.part{n}{ext}"
+
+class ParquetWriter:
+    """
+    チャンクごとに1つの row group として書き出す (pyarrow が必要)
+    Parquet ファイルには追記できないため、再開時は続きを out.partN.parquet に書き出す
+    (ファイルは最初の行を書くときに作るので、新しい行がなければ part ファイルは増えない)
+    """
+
+    def __init__(self, path, fields, append=False):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        if append and os.path.exists(path):
+            path = parquet_part_path(path)
+        self.path = path
+        self.fields = fields
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema([(field, pyarrow.string()) for field in fields])
+        self._writer = None
+
+    def write(self, rows):
+        if not rows:
+            return
+        if self._writer is None:
+            self._writer = self._pyarrow.parquet.ParquetWriter(self.path, self._schema)
+        columns = {
+            field: [None if row.get(field) is None else str(row.get(field)) for row in rows]
+            for field in self.fields
+        }
+        self._writer.write_table(self._pyarrow.table(columns, schema=self._schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+def open_writer(path, fmt, fields, append=False):
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown format: {fmt} (choose from {', '.join(FORMATS)})")
+    return WRITERS[fmt](path, fields, append=append)
+
+def read_cursor(cursor_path):
+    """前回までに読み終えたログの行数を返す (カーソルファイルが無ければ 0)"""
+    if not cursor_path or not os.path.exists(cursor_path):
+        return 0
+    with open(cursor_path, "r", encoding="utf-8") as f:
+        return int(json.load(f).get("offset", 0))
+
+def write_cursor(cursor_path, offset):
+    tmp_path = f"{cursor_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"offset": offset}, f)
+    os.replace(tmp_path, cursor_path)
+
+def export_rows(source, path, fields, fmt="csv", page_size=DEFAULT_PAGE_SIZE,
+                date_from=None, date_to=None, archetype=None, cursor_path=None, date_field="timestamp"):
+    """
+    source を page_size 行ずつ読み、絞り込んで path に書き出す
+    cursor_path を指定すると、チャンクを書き出すごとに読み終えた行数を保存し、次回はその続きから再開する
+    戻り値: (読んだ行数, 書き出した行数)
+    """
+    start = read_cursor(cursor_path)
+    offset = start
+    written = 0
+    writer = open_writer(path, fmt, fields, append=start > 0)
+    try:
+        for page in source.iter_pages(start, page_size):
+            rows = list(filter_log_rows(page, date_from, date_to, archetype, date_field))
+            writer.write(rows)
+            written += len(rows)
+            offset += len(page)
+            if cursor_path:
+                write_cursor(cursor_path, offset)
+    finally:
+        writer.close()
+    return offset - start, written
+
+def export_log(source, path, fmt="csv", page_size=DEFAULT_PAGE_SIZE,
+               date_from=None, date_to=None, archetype=None, cursor_path=None):
+    """ログ (Sheets / CSV) をエクスポートする (日付はアクセス日時で絞り込む)"""
+    return export_rows(source, path, LOG_FIELDS, fmt, page_size,
+                       date_from, date_to, archetype, cursor_path, date_field="timestamp")
+
+def export_results(source, path, fmt="csv", page_size=DEFAULT_PAGE_SIZE,
+                   date_from=None, date_to=None, archetype=None, cursor_path=None):
+    """生成済みメッセージをエクスポートする (日付は占いの対象日で絞り込む)"""
+    return export_rows(source, path, RESULT_FIELDS, fmt, page_size,
+                       date_from, date_to, archetype, cursor_path, date_field="date")
+
+def _parse_date(value):
+    return datetime.datetime.strptime(value, "%Y%m%d").date()
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream the fortune log to CSV / JSONL / Parquet")
+    parser.add_argument("source", nargs="?",
+                        help="Log CSV file (default: Google Sheets via Streamlit secrets), or with --results the results JSONL (default: RESULTS_LOG_PATH)")
+    parser.add_argument("--results", action="store_true", help="Export generated messages instead of the access log")
+    parser.add_argument("-o", "--output", required=True, help="Output file")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--from", dest="date_from", type=_parse_date, help="Start date YYYYMMDD (inclusive)")
+    parser.add_argument("--to", dest="date_to", type=_parse_date, help="End date YYYYMMDD (inclusive)")
+    parser.add_argument("--archetype", help="Only rows whose archetype contains this text")
+    parser.add_argument("--cursor",
+                        help="Cursor file for resuming an interrupted export (Parquet output cannot be appended to, so a resume writes OUTPUT.partN.parquet)")
+    args = parser.parse_args()
+
+    if args.results:
+        results_path = args.source or os.environ.get("RESULTS_LOG_PATH")
+        if not results_path:
+            parser.error("results file is required (argument or RESULTS_LOG_PATH)")
+        source = JsonlResultSource(results_path)
+        export = export_results
+    elif args.source:
+        source = CsvLogSource(args.source)
+        export = export_log
+    else:
+        source = SheetsLogSource(open_log_worksheet())
+        export = export_log
+
+    read, written = export(
+        source, args.output, args.format, args.page_size,
+        date_from=args.date_from, date_to=args.date_to,
+        archetype=args.archetype, cursor_path=args.cursor,
+    )
+    print(f"Exported {written} of {read} rows to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import os
+import json
+import datetime
+import threading
+from collections import OrderedDict
+# src. 付きを優先する理由は main.py の import を参照
+try:
+    from src.bot_logic import calc_day_number, get_archetype_label
+    from src.account_profile import get_profile, calc_pattern_index_for_profile
+    from src.generator import generate_fortune_message, is_error_message
+    from src.main import load_json, choose_quote, QUOTES_FILE, PATTERNS_FILE
+except ModuleNotFoundError:
+    from bot_logic import calc_day_number, get_archetype_label
+    from account_profile import get_profile, calc_pattern_index_for_profile
+    from generator import generate_fortune_message, is_error_message
+    from main import load_json, choose_quote, QUOTES_FILE, PATTERNS_FILE
+
+DEFAULT_RESULT_CACHE_SIZE = 2048
+
+# 格言・パターンのデータはプロセス内で一度だけ読み込む
+_data_store = None
+_data_store_lock = threading.Lock()
+
+def get_data_store():
+    """(quotes_db, patterns_db) を返す (初回のみ JSON を読み込む)"""
+    global _data_store
+    with _data_store_lock:
+        if _data_store is None:
+            _data_store = (load_json(QUOTES_FILE), load_json(PATTERNS_FILE))
+        return _data_store
+
+def build_fortune(account_id, target_date):
+    """
+    アカウントと日付から表示・生成に必要な値をまとめて算出する
+    戻り値: archetype_label, pattern_data, context_data, date_str を持つ dict
+    """
+    quotes_db, patterns_db = get_data_store()
+    date_str = target_date.strftime("%Y%m%d")
+
+    # 名前由来の値はアカウントごとに不変なのでキャッシュから取得
+    profile = get_profile(account_id)
+    name_number = profile["name_number"]
+    day_number = calc_day_number(target_date)
+    pattern_index = calc_pattern_index_for_profile(profile, target_date)
+    pattern_data = patterns_db[pattern_index - 1]
+
+    # 日替わりアーキタイプ (Name + Day)
+    daily_number = ((name_number + day_number - 1) % 9) + 1
+    archetype_label = get_archetype_label(daily_number)
+
+    quote = choose_quote(pattern_data["quote_category"], account_id, date_str, quotes_db)
+
+    context_data = {
+        "account_name": account_id,
+        "archetype": archetype_label,
+        "base_theme": pattern_data["base_theme"],
+        "focus_area": pattern_data["focus_area"],
+        "action_style": pattern_data["action_style"],
+        "caution_style": pattern_data["caution_style"],
+        "day_number": day_number,
+        "quote_ja": quote["quote_ja"],
+        "quote_author_ja": quote.get("author_ja", quote.get("quote_author_ja")),
+        "quote_source_ja": quote.get("source_ja", quote.get("quote_source_ja"))
+    }
+
+    return {
+        "archetype_label": archetype_label,
+        "pattern_data": pattern_data,
+        "context_data": context_data,
+        "date_str": date_str,
+    }
+
+class ResultCache:
+    """
+    (アカウントID, 日付) -> 生成メッセージ の上限付きLRUキャッシュ
+    同じアカウント・同じ日付なら入力が同一なので、共有リンクの再訪問では API を呼ばない
+    """
+
+    def __init__(self, max_size=DEFAULT_RESULT_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._results)
+
+    def __contains__(self, key):
+        return key in self._results
+
+    def get(self, account_id, date_str):
+        key = (account_id, date_str)
+        with self._lock:
+            text = self._results.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, account_id, date_str, text):
+        key = (account_id, date_str)
+        with self._lock:
+            self._results[key] = text
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.misses = 0
+
+result_cache = ResultCache()
+
+# タイムゾーン定義 (JST)
+JST = datetime.timezone(datetime.timedelta(hours=9))
+
+# RESULTS_LOG_PATH を設定した場合、生成したメッセージを JSON Lines で追記保存する
+# (結果キャッシュはプロセス内のメモリにしかないため、エクスポートはこのファイルから行う)
+RESULT_LOG_FIELDS = ["timestamp", "date", "account_id", "archetype", "message"]
+_result_log_lock = threading.Lock()
+
+def append_result_log(fortune, text):
+    """生成したメッセージを RESULTS_LOG_PATH に1行追記する (記録エラーはユーザーに見せない)"""
+    path = os.environ.get("RESULTS_LOG_PATH")
+    if not path:
+        return
+    record = {
+        "timestamp": datetime.datetime.now(JST).strftime("%Y-%m-%d %H:%M:%S"),
+        "date": fortune["date_str"],
+        "account_id": fortune["context_data"]["account_name"],
+        "archetype": fortune["archetype_label"],
+        "message": text,
+    }
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    try:
+        with _result_log_lock:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+    except OSError as e:
+        print(f"Result Logging Error: {e}")
+
+def get_fortune_message(api_key, fortune, generate=generate_fortune_message):
+    """
+    生成メッセージを取得する (キャッシュにあれば API を呼ばない)
+    生成失敗時のメッセージはキャッシュしない
+    """
+    account_id = fortune["context_data"]["account_name"]
+    cached = result_cache.get(account_id, fortune["date_str"])
+    if cached is not None:
+        return cached
+
+    text = generate(api_key, fortune["context_data"])
+    if not is_error_message(text):
+        result_cache.put(account_id, fortune["date_str"], text)
+        append_result_log(fortune, text)
+    return text
@@ -1,7 +1,9 @@
 
 import os
-
-import os
+import ssl
+import json
+import threading
+import http.client
 
 # System Prompt 2 (文章生成用)
 # System Prompt 2 (文章生成用)
@@ -19,18 +21,108 @@ SYSTEM_PROMPT = """
 - 150文字〜200文字程度で簡潔にまとめる。
 """
 
+API_HOST = "generativelanguage.googleapis.com"
+# URLパス内のモデル名を gemini-2.0-flash に変更
+MODEL_PATH = "/v1beta/models/gemini-2.0-flash:generateContent"
+
+RATE_LIMIT_MESSAGE = "【お知らせ】\n現在、AIサービスの利用集中により、一時的にメッセージ生成が制限されています。\n（数分経過すると自動的に解除されますので、少し時間を置いてから再度「受け取る」ボタンを押してみてください）"
+
+# Gemini API への keep-alive 接続プール
+# 毎回 TLS ハンドシェイクからやり直さないよう、使い終わった接続を使い回す
+POOL_MAX_SIZE = 4
+REQUEST_TIMEOUT = 60
+_idle_connections = []
+_pool_lock = threading.Lock()
+
+def _new_connection():
+    return http.client.HTTPSConnection(API_HOST, timeout=REQUEST_TIMEOUT)
+
+def _acquire_connection():
+    with _pool_lock:
+        if _idle_connections:
+            return _idle_connections.pop(), True
+    return _new_connection(), False
+
+def _release_connection(conn):
+    with _pool_lock:
+        if len(_idle_connections) < POOL_MAX_SIZE:
+            _idle_connections.append(conn)
+            return
+    conn.close()
+
+def warm_connection_pool(size=1):
+    """
+    Gemini API への接続 (DNS解決 + TLSハンドシェイク) を事前に確立してプールに入れる
+    確立できた接続数を返す
+    """
+    opened = 0
+    for _ in range(min(size, POOL_MAX_SIZE)):
+        conn = _new_connection()
+        try:
+            conn.connect()
+        except OSError as e:
+            conn.close()
+            print(f"Connection warm-up error: {e}")
+            break
+        _release_connection(conn)
+        opened += 1
+    return opened
+
+def _post(path, body, headers):
+    """プールの接続で POST し (status, 本文) を返す"""
+    while True:
+        conn, reused = _acquire_connection()
+        # 再利用した接続がアイドル中にサーバー側で切られていた場合のみ、新しい接続でやり直す
+        # 送信済みのリクエストを再送すると生成が二重になる (利用枠も消費する) ため、
+        # やり直すのは「送信中の失敗」か「応答が1バイトも届かずに切断された」場合に限る
+        try:
+            conn.request("POST", path, body=body, headers=headers)
+        except OSError as e:
+            # BrokenPipeError / ConnectionResetError / ssl.SSLEOFError 等 (タイムアウトは除く)
+            conn.close()
+            if reused and not isinstance(e, TimeoutError):
+                continue
+            raise
+        except Exception:
+            conn.close()
+            raise
+
+        try:
+            response = conn.getresponse()
+        except (http.client.RemoteDisconnected, ssl.SSLEOFError):
+            # ステータス行を受け取る前に切断された (送信先に届く前に閉じられていた接続)
+            conn.close()
+            if reused:
+                continue
+            raise
+        except Exception:
+            conn.close()
+            raise
+
+        # 応答の受信が始まった後の失敗はやり直さない
+        try:
+            data = response.read()
+        except Exception:
+            conn.close()
+            raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            _release_connection(conn)
+        return response.status, data.decode("utf-8")
+
+def is_error_message(text):
+    """generate_fortune_message の戻り値が生成失敗時のメッセージかどうか"""
+    return text == RATE_LIMIT_MESSAGE or text.startswith(("API Error ", "Error generating message: "))
+
 def generate_fortune_message(api_key, context_data):
 
     """
     Gemini API (REST) を使用して占いメッセージを生成する
     依存ライブラリを排除した実装
     """
-    import json
-    import urllib.request
-    import urllib.error
-
-    # URLパス内のモデル名を gemini-2.0-flash に変更
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
+    path = f"{MODEL_PATH}?key={api_key}"
     
     headers = {
         "Content-Type": "application/json"
@@ -65,20 +157,18 @@ def generate_fortune_message(api_key, context_data):
 
     try:
         data = json.dumps(payload).encode("utf-8")
-        req = urllib.request.Request(url, data=data, headers=headers)
-        
-        with urllib.request.urlopen(req) as response:
-            result = json.loads(response.read().decode("utf-8"))
+        status, body = _post(path, data, headers)
+
+        if 200 <= status < 300:
+            result = json.loads(body)
             # レスポンス構造からテキストを抽出
             # candidates[0].content.parts[0].text
             return result["candidates"][0]["content"]["parts"][0]["text"]
 
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode("utf-8")
         # 429エラー または リソース枯渇エラーを判定
-        if e.code == 429 or str(e.code) == "429" or "RESOURCE_EXHAUSTED" in error_body:
-            return "【お知らせ】\n現在、AIサービスの利用集中により、一時的にメッセージ生成が制限されています。\n（数分経過すると自動的に解除されますので、少し時間を置いてから再度「受け取る」ボタンを押してみてください）"
+        if status == 429 or "RESOURCE_EXHAUSTED" in body:
+            return RATE_LIMIT_MESSAGE
         
-        return f"API Error {e.code}: {error_body}"
+        return f"API Error {status}: {body}"
     except Exception as e:
         return f"Error generating message: {str(e)}"
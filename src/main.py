@@ -4,8 +4,14 @@ import os
 import random
 import datetime
 import argparse
-from bot_logic import calc_name_value, calc_name_number, calc_day_number, calc_pattern_index, get_archetype_label
-from generator import generate_fortune_message
+# streamlit run app.py ではリポジトリ直下が sys.path の先頭になり、
+# 素の import generator だと直下の generator.py が読まれるため src. 付きを優先する
+try:
+    from src.bot_logic import calc_name_value, calc_name_number, calc_day_number, calc_pattern_index, get_archetype_label
+    from src.generator import generate_fortune_message
+except ModuleNotFoundError:
+    from bot_logic import calc_name_value, calc_name_number, calc_day_number, calc_pattern_index, get_archetype_label
+    from generator import generate_fortune_message
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 QUOTES_FILE = os.path.join(DATA_DIR, "quotes.json")
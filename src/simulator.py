@@ -0,0 +1,297 @@
+import json
+import time
+import random
+import datetime
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+# src. 付きを優先する理由は main.py の import を参照
+try:
+    from src.account_profile import get_default_cache
+    from src.generator import RATE_LIMIT_MESSAGE
+    from src.fortune_service import build_fortune, get_fortune_message, result_cache
+    from src.traffic import load_trace, hash_account_id, SOURCE_SHARED, SOURCE_CLICK
+except ModuleNotFoundError:
+    from account_profile import get_default_cache
+    from generator import RATE_LIMIT_MESSAGE
+    from fortune_service import build_fortune, get_fortune_message, result_cache
+    from traffic import load_trace, hash_account_id, SOURCE_SHARED, SOURCE_CLICK
+
+# 記録したトレースを、Gemini / Google Sheets のローカル代替を相手に再生するシミュレータ
+# 待ち時間やキャッシュヒット率、外部APIの呼び出し回数から必要な容量を見積もるために使う
+# (時間はすべて実運用での秒数に換算して報告する)
+
+class SimClock:
+    """speed 倍速で進む仮想時計 (sleep も speed 分の1に短縮する)"""
+
+    def __init__(self, speed, origin):
+        self.speed = speed
+        self.origin = origin
+        self._start = time.monotonic()
+
+    def now(self):
+        return self.origin + (time.monotonic() - self._start) * self.speed
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    def sleep_until(self, timestamp):
+        self.sleep(timestamp - self.now())
+
+class FakeGemini:
+    """
+    Gemini API の代替
+    レイテンシは対数正規分布、1分あたり rpm_limit 回を超えると 429 相当のメッセージを返す
+    (clock は simulate() が設定する)
+    """
+
+    def __init__(self, latency=2.0, jitter=0.3, rpm_limit=15, seed=0, clock=None):
+        self.clock = clock
+        self.latency = latency
+        self.jitter = jitter
+        self.rpm_limit = rpm_limit
+        self.calls = 0
+        self.rate_limited = 0
+        self._random = random.Random(seed)
+        self._recent = []
+        self._lock = threading.Lock()
+
+    def generate(self, api_key, context_data):
+        with self._lock:
+            self.calls += 1
+            now = self.clock.now()
+            self._recent = [t for t in self._recent if now - t < 60]
+            limited = self.rpm_limit and len(self._recent) >= self.rpm_limit
+            if limited:
+                self.rate_limited += 1
+            else:
+                self._recent.append(now)
+            latency = self.latency * self._random.lognormvariate(0, self.jitter)
+
+        if limited:
+            self.clock.sleep(0.2)
+            return RATE_LIMIT_MESSAGE
+        self.clock.sleep(latency)
+        return f"[simulated] {context_data['account_name']} {context_data['archetype']}"
+
+class FakeSheets:
+    """
+    GSheetsConnection の代替 (read / update のみ)
+    ttl 付きの read は Streamlit と同様に ttl の値ごとに別々にキャッシュされ、キャッシュ中は呼び出し回数に数えない
+    (ttl=0 は常に読みに行き、キャッシュも更新しない)
+    app.py のログ記録は「全件 read → 1行追加 → update」なので、並行して書き戻すと
+    後から書いた側が他のリクエストの行を上書きする。その消えた行数を lost_rows に数える
+    """
+
+    def __init__(self, read_latency=0.8, update_latency=1.2, clock=None):
+        self.clock = clock
+        self.read_latency = read_latency
+        self.update_latency = update_latency
+        self.reads = 0
+        self.updates = 0
+        self.lost_rows = 0
+        self.rows = []
+        self._cached_at = {}
+        self._lock = threading.Lock()
+
+    def read(self, ttl=0):
+        with self._lock:
+            now = self.clock.now()
+            cached_at = self._cached_at.get(ttl)
+            if ttl and cached_at is not None and now - cached_at < ttl:
+                return list(self.rows)
+            self.reads += 1
+            if ttl:
+                self._cached_at[ttl] = now
+        self.clock.sleep(self.read_latency)
+        with self._lock:
+            return list(self.rows)
+
+    def update(self, data):
+        with self._lock:
+            self.updates += 1
+        self.clock.sleep(self.update_latency)
+        with self._lock:
+            # data は読み込み時点の行 + 追加した1行。読み込み後に他で追加された行は上書きで消える
+            self.lost_rows += max(0, len(self.rows) - (len(data) - 1))
+            self.rows = list(data)
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return round(values[index], 3)
+
+def _summary(values):
+    return {
+        "p50": _percentile(values, 50),
+        "p95": _percentile(values, 95),
+        "max": round(max(values), 3) if values else None,
+    }
+
+def make_synthetic_trace(requests, accounts=200, duration=3600, shared_ratio=0.3, date_str=None, seed=0):
+    """
+    朝のピークを模した合成トレースを作る (実トレースが無いときの見積もり用)
+    到着時刻は区間の前半に寄せ、アカウントは一部に偏るように選ぶ
+    """
+    rng = random.Random(seed)
+    if date_str is None:
+        date_str = datetime.date.today().strftime("%Y%m%d")
+    origin = time.time()
+    account_hashes = [hash_account_id(f"user{i}", salt="synthetic") for i in range(accounts)]
+    events = []
+    for _ in range(requests):
+        account = account_hashes[min(accounts - 1, int(rng.paretovariate(1.2)) - 1)]
+        events.append({
+            "t": round(origin + duration * rng.betavariate(2, 5), 3),
+            "a": account,
+            "d": date_str,
+            "s": SOURCE_SHARED if rng.random() < shared_ratio else SOURCE_CLICK,
+        })
+    events.sort(key=lambda e: e["t"])
+    return events
+
+def simulate(events, speed=10.0, workers=None, gemini=None, sheets=None, seed=0):
+    """
+    トレースを speed 倍速で再生し、コアの処理 (fortune_service) を app.py と同じ順序で実行する
+    Streamlit はスクリプトの同時実行数に上限を設けないため、既定 (workers=None) では
+    リクエストごとにスレッドを割り当てる。混雑は次の指標に現れる
+    - in_flight: 到着済みで完了していないリクエスト数 (到着時点の値の分布と最大値)
+    - log_writes_in_flight / sheets_lost_log_rows: ログの read → update が重なった数と、上書きで消えた行数
+    workers を指定した場合のみ同時実行数を制限し、その制限による待ち時間を queue_wait_sec として報告する
+    """
+    if not events:
+        raise ValueError("trace is empty")
+
+    clock = SimClock(speed, events[0]["t"])
+    gemini = gemini or FakeGemini(seed=seed)
+    sheets = sheets or FakeSheets()
+    gemini.clock = clock
+    sheets.clock = clock
+
+    # 計測のためキャッシュを空の状態から始める
+    result_cache.clear()
+    profile_cache = get_default_cache()
+    profile_cache.clear()
+
+    waits = []
+    latencies = []
+    in_flight_samples = []
+    counters = {"in_flight": 0, "in_flight_peak": 0, "log_writes": 0, "log_writes_peak": 0}
+    by_source = {SOURCE_SHARED: 0, SOURCE_CLICK: 0}
+    stats_lock = threading.Lock()
+
+    def handle(event, arrived_at):
+        started_at = clock.now()
+        target_date = datetime.datetime.strptime(event["d"], "%Y%m%d").date()
+        fortune = build_fortune(event["a"], target_date)
+
+        # ログ記録 (app.py と同じく全件読んで1行足して書き戻す)
+        with stats_lock:
+            counters["log_writes"] += 1
+            counters["log_writes_peak"] = max(counters["log_writes_peak"], counters["log_writes"])
+        rows = sheets.read(ttl=0)
+        rows.append({"timestamp": started_at, "account_id": event["a"], "archetype": fortune["archetype_label"]})
+        sheets.update(rows)
+        with stats_lock:
+            counters["log_writes"] -= 1
+
+        get_fortune_message("simulated", fortune, generate=gemini.generate)
+
+        # フッターのカウンタ表示
+        sheets.read(ttl=10)
+
+        finished_at = clock.now()
+        with stats_lock:
+            counters["in_flight"] -= 1
+            waits.append(started_at - arrived_at)
+            latencies.append(finished_at - arrived_at)
+            source = event.get("s", SOURCE_CLICK)
+            by_source[source] = by_source.get(source, 0) + 1
+
+    wall_start = time.monotonic()
+    # スレッドは必要になった分だけ作られるので、上限なしはイベント数を上限として扱う
+    with ThreadPoolExecutor(max_workers=workers or len(events)) as executor:
+        futures = []
+        for event in events:
+            clock.sleep_until(event["t"])
+            with stats_lock:
+                counters["in_flight"] += 1
+                counters["in_flight_peak"] = max(counters["in_flight_peak"], counters["in_flight"])
+                in_flight_samples.append(counters["in_flight"])
+            futures.append(executor.submit(handle, event, clock.now()))
+    # 処理中の例外はここで送出する
+    for future in futures:
+        future.result()
+    wall_time = time.monotonic() - wall_start
+
+    span = max(events[-1]["t"] - events[0]["t"], 1e-9)
+    lookups = result_cache.hits + result_cache.misses
+    report = {
+        "requests": len(events),
+        "requests_by_source": by_source,
+        "speed": speed,
+        "workers": workers or "unbounded",
+        "trace_span_sec": round(span, 3),
+        "wall_time_sec": round(wall_time, 3),
+        "arrival_rate_per_min": round(len(events) / span * 60, 2),
+        "in_flight": {
+            "p50": _percentile(in_flight_samples, 50),
+            "p95": _percentile(in_flight_samples, 95),
+            "max": counters["in_flight_peak"],
+        },
+        "latency_sec": _summary(latencies),
+        "result_cache": {
+            "hits": result_cache.hits,
+            "misses": result_cache.misses,
+            "hit_rate": round(result_cache.hits / lookups, 3) if lookups else None,
+        },
+        "profile_cache": {
+            "hits": profile_cache.hits,
+            "misses": profile_cache.misses,
+        },
+        "upstream": {
+            "gemini_calls": gemini.calls,
+            "gemini_rate_limited": gemini.rate_limited,
+            "sheets_reads": sheets.reads,
+            "sheets_updates": sheets.updates,
+            "log_writes_in_flight_max": counters["log_writes_peak"],
+            "sheets_lost_log_rows": sheets.lost_rows,
+        },
+    }
+    if workers:
+        # 上限なしでは待ちが発生しないので、上限を指定したときだけ報告する
+        report["queue_wait_sec"] = _summary(waits)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded traffic against local stand-ins")
+    parser.add_argument("trace", nargs="?", help="Trace file recorded with TRAFFIC_TRACE_PATH")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generate N synthetic requests instead of reading a trace")
+    parser.add_argument("--speed", type=float, default=10.0, help="Replay speed (1-100)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Cap on concurrent requests (default: unbounded, like Streamlit); queue_wait_sec is reported only with a cap")
+    parser.add_argument("--gemini-latency", type=float, default=2.0, help="Median Gemini latency in seconds")
+    parser.add_argument("--gemini-rpm", type=int, default=15, help="Gemini requests per minute before 429 (0 = unlimited)")
+    parser.add_argument("--sheets-latency", type=float, default=0.8, help="Sheets read latency in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not 1 <= args.speed <= 100:
+        parser.error("--speed must be between 1 and 100")
+    if args.synthetic:
+        events = make_synthetic_trace(args.synthetic, seed=args.seed)
+    elif args.trace:
+        events = load_trace(args.trace)
+    else:
+        parser.error("either a trace file or --synthetic is required")
+
+    gemini = FakeGemini(latency=args.gemini_latency, rpm_limit=args.gemini_rpm, seed=args.seed)
+    sheets = FakeSheets(read_latency=args.sheets_latency)
+    report = simulate(events, speed=args.speed, workers=args.workers, gemini=gemini, sheets=sheets, seed=args.seed)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import hashlib
+import secrets
+import threading
+
+SOURCE_SHARED = "shared"
+SOURCE_CLICK = "click"
+
+def hash_account_id(account_id, salt):
+    """
+    アカウントIDを匿名化する (同じIDは同じハッシュになるのでキャッシュの挙動は再現できる)
+    X のアカウントIDは公開情報なので、ソルト無しのハッシュは総当たりで元に戻せてしまう
+    """
+    if not salt:
+        raise ValueError("salt is required to anonymize account IDs")
+    return hashlib.sha256(f"{salt}{account_id}".encode("utf-8")).hexdigest()[:16]
+
+class TrafficRecorder:
+    """
+    リクエストのトレースを JSON Lines で追記記録する
+    1行1リクエスト: {"t": 到着時刻(UNIX秒), "a": アカウントハッシュ, "d": 対象日付(YYYYMMDD), "s": "shared" | "click"}
+    """
+
+    def __init__(self, path, salt):
+        if not salt:
+            raise ValueError("salt is required to anonymize account IDs")
+        self.path = path
+        self.salt = salt
+        self._lock = threading.Lock()
+
+    def record(self, account_id, date_str, source, timestamp=None):
+        event = {
+            "t": round(time.time() if timestamp is None else timestamp, 3),
+            "a": hash_account_id(account_id, self.salt),
+            "d": date_str,
+            "s": source,
+        }
+        line = json.dumps(event, separators=(",", ":")) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+def load_trace(path):
+    """トレースファイルを読み込み、到着時刻順のリストで返す (壊れた行は読み飛ばす)"""
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    events.sort(key=lambda e: e["t"])
+    return events
+
+def load_or_create_salt(salt_path):
+    """
+    ソルトをファイルから読む (無ければランダムに生成して保存する)
+    同じソルトを使い続けることで、再起動をまたいでも同じアカウントは同じハッシュになる
+    """
+    if os.path.exists(salt_path):
+        with open(salt_path, "r", encoding="utf-8") as f:
+            salt = f.read().strip()
+        if salt:
+            return salt
+    salt = secrets.token_hex(16)
+    fd = os.open(salt_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(salt)
+    return salt
+
+# TRAFFIC_TRACE_PATH を設定した場合のみ記録する
+# ソルトは TRAFFIC_TRACE_SALT、未設定ならトレースと同じ場所の <TRAFFIC_TRACE_PATH>.salt を使う
+# (トレースを共有するときは .salt ファイルは渡さないこと)
+_recorder = None
+_recorder_lock = threading.Lock()
+
+def get_recorder():
+    global _recorder
+    path = os.environ.get("TRAFFIC_TRACE_PATH")
+    if not path:
+        return None
+    with _recorder_lock:
+        if _recorder is None or _recorder.path != path:
+            salt = os.environ.get("TRAFFIC_TRACE_SALT") or load_or_create_salt(f"{path}.salt")
+            _recorder = TrafficRecorder(path, salt)
+        return _recorder
+
+def record_request(account_id, date_str, source):
+    """リクエストを記録する (記録エラーはユーザーに見せない)"""
+    try:
+        recorder = get_recorder()
+        if recorder is None:
+            return
+        recorder.record(account_id, date_str, source)
+    except OSError as e:
+        print(f"Trace Recording Error: {e}")
@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import datetime
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+# src. 付きを優先する理由は main.py の import を参照
+try:
+    from src.account_profile import get_profiles
+    from src.generator import warm_connection_pool
+    from src.fortune_service import get_data_store, build_fortune, get_fortune_message, result_cache
+except ModuleNotFoundError:
+    from account_profile import get_profiles
+    from generator import warm_connection_pool
+    from fortune_service import get_data_store, build_fortune, get_fortune_message, result_cache
+
+# タイムゾーン定義 (JST)
+JST = datetime.timezone(datetime.timedelta(hours=9))
+
+DEFAULT_TOP_N = 10
+# 直近何件のログから「よく来るアカウント」を選ぶか
+RECENT_LOG_ROWS = 500
+
+class WarmupState:
+    """
+    ウォームアップの進行状況
+    status: "pending" -> "running" -> "ready" (途中で例外が出た場合も "ready" にし、error に記録する)
+    """
+
+    def __init__(self):
+        self.status = "pending"
+        self.started_at = None
+        self.finished_at = None
+        self.duration = None
+        self.steps = {}
+        self.prefilled = 0
+        self.trigger = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def is_ready(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        return {
+            "ready": self.is_ready(),
+            "status": self.status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_sec": self.duration,
+            "steps_sec": dict(self.steps),
+            "prefilled": self.prefilled,
+            "trigger": self.trigger,
+            "error": self.error,
+        }
+
+    def write_status_file(self):
+        """
+        WARMUP_STATUS_PATH を設定した場合、状態を JSON ファイルに書き出す
+        (Streamlit のページは WebSocket 経由で描画されるため、外部の死活監視からはこのファイルか
+        start_health_server() のエンドポイントで準備完了を確認する)
+        """
+        path = os.environ.get("WARMUP_STATUS_PATH")
+        if not path:
+            return
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warm-up status write error: {e}")
+
+state = WarmupState()
+
+def recent_account_ids(log_df, top_n=DEFAULT_TOP_N, rows=RECENT_LOG_ROWS):
+    """ログ (DataFrame) の直近 rows 件から、出現回数の多いアカウントを top_n 件返す"""
+    if log_df is None or "account_id" not in log_df.columns:
+        return []
+    account_ids = [str(a) for a in log_df["account_id"].tail(rows).dropna() if str(a)]
+    return [account_id for account_id, _ in Counter(account_ids).most_common(top_n)]
+
+def _timed(name, func, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        state.steps[name] = round(time.perf_counter() - start, 3)
+
+def prefill_results(api_key, account_ids, target_date):
+    """
+    今日の結果キャッシュを事前に埋める
+    レート制限などで生成に失敗したら、それ以上は API を呼ばずに打ち切る
+    """
+    filled = 0
+    for account_id in account_ids:
+        fortune = build_fortune(account_id, target_date)
+        get_fortune_message(api_key, fortune)
+        if (account_id, fortune["date_str"]) not in result_cache:
+            break
+        filled += 1
+    return filled
+
+def run_warmup(conn=None, api_key=None, top_n=DEFAULT_TOP_N, target_date=None, trigger="process"):
+    """
+    最初のユーザーリクエストの前に、データ・接続・キャッシュを用意する
+    各ステップの所要時間は state.steps に記録される
+    trigger: "process" (serve.py からの起動時) / "session" (app.py の初回実行時のフォールバック)
+    """
+    with state._lock:
+        if state.status != "pending":
+            return state
+        state.status = "running"
+        state.trigger = trigger
+        state.started_at = datetime.datetime.now(JST).strftime("%Y-%m-%d %H:%M:%S")
+    state.write_status_file()
+
+    start = time.perf_counter()
+    try:
+        _timed("data_store", get_data_store)
+
+        if api_key:
+            _timed("connection_pool", warm_connection_pool)
+
+        account_ids = []
+        if conn is not None and top_n > 0:
+            log_df = _timed("log_read", conn.read, ttl=0)
+            account_ids = recent_account_ids(log_df, top_n)
+        _timed("profiles", get_profiles, account_ids)
+
+        if api_key and account_ids:
+            if target_date is None:
+                target_date = datetime.datetime.now(JST).date()
+            state.prefilled = _timed("prefill", prefill_results, api_key, account_ids, target_date)
+    except Exception as e:
+        # ウォームアップの失敗はユーザーに見せない（コンソールのみ）
+        state.error = str(e)
+        print(f"Warm-up Error: {e}")
+    finally:
+        state.duration = round(time.perf_counter() - start, 3)
+        state.finished_at = datetime.datetime.now(JST).strftime("%Y-%m-%d %H:%M:%S")
+        state.status = "ready"
+        state._done.set()
+        state.write_status_file()
+        print(f"Warm-up finished in {state.duration}s: {state.steps}")
+    return state
+
+def start_warmup(conn=None, api_key=None, top_n=None, trigger="process"):
+    """ウォームアップをバックグラウンドスレッドで開始する (2回目以降の呼び出しは何もしない)"""
+    if state.status != "pending":
+        return None
+    if top_n is None:
+        top_n = int(os.environ.get("WARMUP_TOP_N", DEFAULT_TOP_N))
+    thread = threading.Thread(
+        target=run_warmup,
+        kwargs={"conn": conn, "api_key": api_key, "top_n": top_n, "trigger": trigger},
+        name="warmup",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+def is_ready():
+    return state.is_ready()
+
+def get_status():
+    return state.to_dict()
+
+class _HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/ready", "/healthz"):
+            self.send_error(404)
+            return
+        body = json.dumps(get_status(), ensure_ascii=False).encode("utf-8")
+        # ウォームアップ完了までは 503 を返す
+        self.send_response(200 if is_ready() else 503)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_health_server(port, host="0.0.0.0"):
+    """GET /ready でウォームアップ状態を返す HTTP サーバーをバックグラウンドで起動する"""
+    server = ThreadingHTTPServer((host, port), _HealthHandler)
+    thread = threading.Thread(target=server.serve_forever, name="warmup-health", daemon=True)
+    thread.start()
+    return server
+
+if __name__ == "__main__":
+    # ローカル確認用: Sheets 接続なしでウォームアップを実行して所要時間を表示
+    run_warmup(api_key=os.environ.get("GEMINI_API_KEY"))
+    print(json.dumps(get_status(), ensure_ascii=False, indent=2))
@@ -0,0 +1,128 @@
+import os
+import re
+import csv
+import sys
+import json
+import datetime
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.export import (
+    DEFAULT_PAGE_SIZE, LOG_FIELDS, CsvLogSource, JsonlResultSource, SheetsLogSource,
+    export_log, export_results,
+)
+
+SMALL_LOG_ROWS = 2_000
+LARGE_LOG_ROWS = 100_000
+# ログが50倍になってもピークメモリはほぼ変わらないこと
+MAX_PEAK_RATIO = 1.5
+
+class FakeWorksheet:
+    """gspread.Worksheet の代替 (指定された行範囲の分だけ行を生成する)"""
+
+    HEADER = ["timestamp", "account_id", "archetype", "theme"]
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.requested_rows = []
+
+    def row_values(self, row):
+        return list(self.HEADER)
+
+    def get(self, range_name):
+        first_row, last_row = (int(n) for n in re.findall(r"\d+", range_name))
+        last_row = min(last_row, self.rows + 1)
+        self.requested_rows.append(last_row - first_row + 1)
+        return [
+            ["2025-01-01 00:00:00", f"user{i % 5000}", "チャレンジャー型（攻め／起業家気質）", "つながる / 学習"]
+            for i in range(first_row, last_row + 1)
+        ]
+
+def write_synthetic_log(path, rows):
+    """app.py の記録形式と同じ列の合成ログを書き出す"""
+    origin = datetime.datetime(2025, 1, 1)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=LOG_FIELDS)
+        writer.writeheader()
+        for i in range(rows):
+            writer.writerow({
+                "timestamp": (origin + datetime.timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+                "account_id": f"user{i % 5000}",
+                "archetype": "チャレンジャー型（攻め／起業家気質）" if i % 9 == 0 else "バランサー型（調整役・人間関係）",
+                "theme": "つながる / 学習",
+            })
+
+def _peak_memory(export):
+    tracemalloc.start()
+    try:
+        result = export()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, result
+
+def _csv_export_peak(rows, tmp_path):
+    log_path = tmp_path / f"log_{rows}.csv"
+    write_synthetic_log(log_path, rows)
+    peak, (read, written) = _peak_memory(
+        lambda: export_log(CsvLogSource(str(log_path)), str(tmp_path / f"csv_{rows}.jsonl"), "jsonl")
+    )
+    assert read == written == rows
+    return peak
+
+def _sheets_export_peak(rows, tmp_path):
+    worksheet = FakeWorksheet(rows)
+    peak, (read, written) = _peak_memory(
+        lambda: export_log(SheetsLogSource(worksheet), str(tmp_path / f"sheets_{rows}.jsonl"), "jsonl")
+    )
+    assert read == written == rows
+    return peak, worksheet
+
+def test_csv_export_peak_memory_is_constant(tmp_path):
+    small = _csv_export_peak(SMALL_LOG_ROWS, tmp_path)
+    large = _csv_export_peak(LARGE_LOG_ROWS, tmp_path)
+    assert large <= small * MAX_PEAK_RATIO
+
+def test_sheets_export_reads_fixed_size_pages_with_constant_memory(tmp_path):
+    small, _ = _sheets_export_peak(SMALL_LOG_ROWS, tmp_path)
+    large, worksheet = _sheets_export_peak(LARGE_LOG_ROWS, tmp_path)
+    assert large <= small * MAX_PEAK_RATIO
+    assert max(worksheet.requested_rows) <= DEFAULT_PAGE_SIZE
+
+def test_export_resumes_from_cursor(tmp_path):
+    output = tmp_path / "log.csv"
+    cursor = tmp_path / "cursor.json"
+    assert export_log(SheetsLogSource(FakeWorksheet(1200)), str(output), cursor_path=str(cursor)) == (1200, 1200)
+    # 追加された行だけが読まれ、ヘッダーは重複しない
+    assert export_log(SheetsLogSource(FakeWorksheet(1250)), str(output), cursor_path=str(cursor)) == (50, 50)
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1 + 1250
+    assert lines.count(lines[0]) == 1
+
+def test_results_export_filters_by_target_date_and_resumes(tmp_path):
+    results = tmp_path / "results.jsonl"
+    output = tmp_path / "results.csv"
+    cursor = tmp_path / "cursor.json"
+
+    def append_results(dates):
+        with open(results, "a", encoding="utf-8") as f:
+            for i, date_str in enumerate(dates):
+                f.write(json.dumps({
+                    "timestamp": "2025-01-01 08:00:00", "date": date_str, "account_id": f"user{i}",
+                    "archetype": "ビルダー型（堅実・積み上げ）", "message": "今日は…",
+                }, ensure_ascii=False) + "\n")
+
+    append_results(["20250101", "20250102"] * 600)
+    target = datetime.date(2025, 1, 2)
+    assert export_results(JsonlResultSource(str(results)), str(output), date_from=target, date_to=target,
+                          cursor_path=str(cursor)) == (1200, 600)
+    # 書き込み途中で切れた行は読み飛ばす
+    with open(results, "a", encoding="utf-8") as f:
+        f.write('{"timestamp": "2025-01-0\n')
+    append_results(["20250102"] * 10)
+    assert export_results(JsonlResultSource(str(results)), str(output), date_from=target, date_to=target,
+                          cursor_path=str(cursor)) == (11, 10)
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "timestamp,date,account_id,archetype,message"
+    assert len(lines) == 1 + 610